@@ -0,0 +1,174 @@
+"""
+Solves which tower heights are winning or losing for many game settings at
+once.
+
+Whether a position is winning only depends on the distance to the topple
+height (d = topple_height - tower_height) and the possible actions:
+- d = 1: every action topples the tower, so the position is losing.
+- otherwise the position is winning if some action `a` (with a < d) passes
+the opponent a losing position at distance d - a.
+
+Working upwards through the distances therefore solves every topple height
+in a single pass. Many action sets are also solved in the same pass by
+giving each one a bit in a Python integer ('bit slicing'): bit i of
+losing[d] is set if distance d is losing for action set i.
+"""
+
+import argparse
+import csv
+import itertools
+import sys
+import time
+
+
+def solve_action_sets(action_sets, max_height):
+    """
+    Solves every action set in `action_sets` for all topple heights up to
+    `max_height` in one shared pass.
+
+    Returns a list (in the same order as `action_sets`) of integers where
+    bit d is set if the position at distance d from the topple height is
+    losing for the player about to move.
+    """
+    all_sets = (1 << len(action_sets)) - 1
+
+    # has_action[a]: bit i is set if action set i contains action a
+    has_action = {}
+    for i, actions in enumerate(action_sets):
+        for action in actions:
+            has_action[action] = has_action.get(action, 0) | 1 << i
+    actions_used = sorted(has_action)
+
+    losing = [0] * max_height  # Distances 1 to max_height - 1
+    for distance in range(1, max_height):
+        winning = 0
+        for action in actions_used:
+            if action >= distance:
+                break  # Any larger action topples the tower
+            winning |= has_action[action] & losing[distance - action]
+        losing[distance] = all_sets & ~winning
+
+    # Transpose into one bitset of losing distances per action set
+    columns = [0] * len(action_sets)
+    for distance in range(1, max_height):
+        bits = losing[distance]
+        while bits:
+            low_bit = bits & -bits
+            columns[low_bit.bit_length() - 1] |= 1 << distance
+            bits ^= low_bit
+    return columns
+
+
+def iter_solutions(action_sets, heights, batch_size=4096):
+    """
+    Streams solutions for every combination of action set and topple
+    height, solving `batch_size` action sets per shared pass so that memory
+    use stays bounded for very large families.
+
+    Yields (topple_height, actions, losing_heights) where bit n of
+    losing_heights is set if a tower of height n (1 <= n < topple_height)
+    is a losing position for the player about to move.
+    """
+    heights = list(heights)
+    max_height = max(heights)
+    action_sets = iter(action_sets)
+    while True:
+        batch = list(itertools.islice(action_sets, batch_size))
+        if not batch:
+            return
+        for actions, losing_distances in zip(
+            batch, solve_action_sets(batch, max_height)
+        ):
+            # Reverse the bits once so that each topple height only needs a
+            # shift: bit (max_height - d) of reversed_bits is distance d
+            reversed_bits = int(
+                f"{losing_distances:0{max_height + 1}b}"[::-1], 2
+            )
+            for topple_height in heights:
+                losing_heights = (
+                    reversed_bits >> (max_height - topple_height)
+                ) & ((1 << topple_height) - 2)
+                yield topple_height, actions, losing_heights
+
+
+def iter_action_sets(max_action, min_size=2):
+    """
+    Yields every set of possible actions (as a sorted tuple) drawn from
+    1..max_action with at least `min_size` actions.
+    """
+    for size in range(min_size, max_action + 1):
+        yield from itertools.combinations(range(1, max_action + 1), size)
+
+
+def get_losing_heights(losing_heights):
+    """
+    Returns the tower heights set in a losing_heights bitset as a list.
+    """
+    return [
+        height for height in range(losing_heights.bit_length())
+        if losing_heights >> height & 1
+    ]
+
+
+def main():
+    """
+    Solves all action sets drawn from 1..N for a range of topple heights and
+    streams the results to a CSV file (or stdout).
+    """
+    parser = argparse.ArgumentParser(
+        description="Solve winning/losing tower heights for many settings."
+    )
+    parser.add_argument(
+        "--max-action", type=int, default=10,
+        help="solve every action set drawn from 1..N (default 10)"
+    )
+    parser.add_argument(
+        "--min-height", type=int, default=10,
+        help="lowest topple height (default 10)"
+    )
+    parser.add_argument(
+        "--max-height", type=int, default=100,
+        help="highest topple height (default 100)"
+    )
+    parser.add_argument(
+        "--output", default="-",
+        help="CSV file to write (default: stdout)"
+    )
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    file = (
+        sys.stdout if args.output == "-"
+        else open(args.output, "w", newline="", encoding="utf-8")
+    )
+    try:
+        writer = csv.writer(file)
+        writer.writerow([
+            "topple_height", "possible_actions", "first_player_wins",
+            "losing_heights"
+        ])
+        rows = 0
+        for topple_height, actions, losing_heights in iter_solutions(
+            iter_action_sets(args.max_action),
+            range(args.min_height, args.max_height + 1)
+        ):
+            writer.writerow([
+                topple_height,
+                " ".join(map(str, actions)),
+                int(not losing_heights & 1 << 1),
+                " ".join(map(str, get_losing_heights(losing_heights))),
+            ])
+            rows += 1
+    finally:
+        if file is not sys.stdout:
+            file.close()
+
+    print(
+        f"Solved {rows} settings in "
+        f"{time.perf_counter() - start_time:.1f} seconds",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
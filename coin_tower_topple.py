@@ -1,6 +1,19 @@
+import os
 import sys
 import random
 
+from game_log import GameEventLog
+from idle_sessions import (
+    IdleTimeoutError,
+    SessionStore,
+    get_process_bytes,
+    get_q_table_bytes,
+    timed_input,
+)
+from policy_cache import PolicyCache
+from training_dispatcher import TrainingDispatcher
+from training_scheduler import TrainingScheduler
+
 
 class CustomError(Exception):
     """
@@ -19,6 +32,10 @@ class CoinTowerTopple:
     Use the start() method to launch the app
     """
 
+    # Seconds to wait for user input before an idle session is suspended
+    # (can be overridden with the IDLE_TIMEOUT environment variable)
+    IDLE_TIMEOUT = 600
+
     # Mapping of difficulty levels to their properties:
     # Key: difficulty_level
     # Value: [description, explore_fraction]
@@ -29,19 +46,50 @@ class CoinTowerTopple:
     }
 
     # Initialisation and Game Entry
-    def __init__(self):
+    def __init__(self, session_id="local"):
         """
         Initializes the CoinTowerTopple game with default settings.
 
         Defines:
         - default game settings: difficulty, topple height, possible actions
         - Main Menu options: option IDs, descriptions and callback methods
+        - session storage used to suspend and resume idle sessions
+        - the event log used to record moves and results of games
+
+        Parameters:
+        session_id (str, optional): Identifies the player's session so that
+        a suspended session can be restored when they reconnect.
         """
         # Game settings
         self.difficulty_level = 1  # Key for DIFFICULTY_LEVEL_MAP
         self.topple_height = 21  # Number of coins that causes tower to topple
         self.possible_actions = [1, 2, 3]  # Sorted list of numbers (ascending)
 
+        # Game in progress (None when no game is being played)
+        self.ai = None
+        self.tower_height = None
+        self.player = None  # 0: human, 1: computer
+
+        # Idle session handling
+        try:
+            self.idle_timeout = int(
+                os.environ.get("IDLE_TIMEOUT", self.IDLE_TIMEOUT)
+            )
+        except ValueError:
+            self.idle_timeout = self.IDLE_TIMEOUT
+        self.session = SessionStore(session_id)
+        self.policy_cache = PolicyCache()
+
+        # Chooses how to prepare the AI (cache, exact solve or training),
+        # sharing training runs with other sessions on the same host
+        self.dispatcher = TrainingDispatcher(
+            self.policy_cache,
+            scheduler=TrainingScheduler(self.policy_cache)
+        )
+
+        # Log of moves and results for offline analysis
+        self.game_log = GameEventLog()
+
         # Main Menu options:
         # Key: option ID (user input)
         # Value: [description, callback methods]
@@ -57,10 +105,16 @@ class CoinTowerTopple:
         Launches the app.
 
         Displays the game title and default game settings before starting the
-        Main Menu loop.
+        Main Menu loop. If the session was previously suspended for being
+        idle, the saved settings (and any game in progress) are restored
+        first.
         """
         print(self._get_title_str())
-        print(self._get_settings_str())
+        snapshot = self.session.load()
+        if snapshot:
+            self._resume(snapshot)
+        else:
+            print(self._get_settings_str())
         self._run_main_menu()
 
     # Main Menu and Callbacks
@@ -83,7 +137,7 @@ class CoinTowerTopple:
         while True:
             try:
                 # Display options and get user response
-                response = int(input(prompt + "\n"))
+                response = int(self._input(prompt + "\n"))
 
                 # Check response is valid main_options key
                 if response not in self.main_options:
@@ -99,14 +153,14 @@ class CoinTowerTopple:
                 # Call relevant function
                 self.main_options[response][1]()
 
-    def _play(self):
+    def _play(self, tower_height=1, player=None, ai=None, show_menu=True):
         """
         Runs the main game loop to allow a human player to compete against an
         AI opponent.
 
         The method:
-        - Initializes an AI player and trains it using reinforcement learning
-        with the current game settings.
+        - Initializes an AI player and prepares its Q-values for the current
+        game settings (by training, solving or loading a cached policy).
         - Displays the 'Play Game' title screen and game settings
         - Determines which player (human or AI) has the first move and starts
         the game.
@@ -116,21 +170,28 @@ class CoinTowerTopple:
         height and declares the winner.
         - Prompts the user about whether they want to play again. If so,
         starts a new game, otherwise returns to the main menu.
+
+        Parameters:
+        tower_height (int, optional): Tower height to start the first game
+        from. Used when resuming a suspended game. Defaults to 1.
+        player (int, optional): Player whose turn it is (0: human,
+        1: computer) when resuming a suspended game. Defaults to None, in
+        which case the first player is chosen at random.
+        ai (AIPlayer, optional): An AI player that has already been prepared
+        (e.g. restored from a suspended session). Defaults to None, in which
+        case a new AI player is prepared.
+        show_menu (bool, optional): Whether to display the Main Menu when
+        the player chooses not to play again. Defaults to True.
         """
 
         # Initialise AI with current game settings
-        ai = AIPlayer(
-            self.difficulty_level,
-            self.topple_height,
-            self.possible_actions
-        )
-
-        # Train AI (to get q_values)
-        ai.train(10000)
+        if ai is None:
+            ai = self._get_trained_ai()
+        self.ai = ai
 
         # Apply difficulty level setting to AI
         # (by stating probability that it makes a random decision)
-        explore_fraction = self.DIFFICULTY_LEVEL_MAP[self.difficulty_level][1]
+        explore_fraction = self._get_explore_fraction()
 
         # Begin loop for replaying the game
         replay = True
@@ -144,19 +205,25 @@ class CoinTowerTopple:
                 f"{self._get_settings_str()}\n\n"
             )
 
-            # Reset tower height and game state
-            tower_height = 1
+            # Reset game state
             game_state = -1
 
-            # Choose which player starts - 0: human, 1: computer
-            player = random.choice([0, 1])
-            print(
-                f"{'You' if player == 0 else 'Computer'} "
-                "won the toss to take first move ..."
-            )
+            if player is None:
+                # Choose which player starts - 0: human, 1: computer
+                player = random.choice([0, 1])
+                print(
+                    f"{'You' if player == 0 else 'Computer'} "
+                    "won the toss to take first move ..."
+                )
+            else:
+                print("Resuming your game ...")
 
             # Enter game loop
             while game_state < 0:
+                # Record progress in case the session is suspended
+                self.tower_height = tower_height
+                self.player = player
+
                 # Display current coin count
                 print(
                     "\nTower height: "
@@ -176,6 +243,12 @@ class CoinTowerTopple:
                         f"{'coin' if add_coins == 1 else 'coins'}"
                     )
 
+                # Record move for offline analysis
+                self.game_log.log_move(
+                    self.difficulty_level, self.topple_height,
+                    self.possible_actions, tower_height, player, add_coins
+                )
+
                 # Update tower_height and update game_state if required
                 tower_height += add_coins
                 if tower_height >= self.topple_height:
@@ -186,6 +259,12 @@ class CoinTowerTopple:
 
             # Game End
             print("\nTOWER HAS TOPPLED!\n")
+            self.tower_height = None
+            self.player = None
+            self.game_log.log_result(
+                self.difficulty_level, self.topple_height,
+                self.possible_actions, tower_height, game_state
+            )
 
             if game_state == 0:  # Human player won
                 print(
@@ -209,7 +288,13 @@ class CoinTowerTopple:
             if response != "y":
                 replay = False
 
-        print(self._get_main_menu_str())
+            # Reset tower height and starting player for the next game
+            tower_height = 1
+            player = None
+
+        self.ai = None
+        if show_menu:
+            print(self._get_main_menu_str())
 
     def _change_settings(self):
         """
@@ -217,7 +302,9 @@ class CoinTowerTopple:
         difficulty level, topple height, and possible actions.
 
         If all inputs are valid, the updated configuration is displayed
-        before returning to the main menu.
+        before returning to the main menu. The settings are only changed once
+        all three inputs are valid (so a session suspended part way through
+        keeps its previous, valid settings).
         """
 
         # Show introductory message
@@ -234,7 +321,7 @@ Difficulty Options
 
         # Choose difficulty
         prompt = "Choose difficulty option (1, 2 or 3): "
-        self.difficulty_level = self._get_valid_int(prompt, 1, 3)
+        difficulty_level = self._get_valid_int(prompt, 1, 3)
         print("- OK\n")
         print(
             "-----------------------------------------------------------------"
@@ -243,7 +330,7 @@ Difficulty Options
 
         # Choose topple height
         prompt = "Specify the Topple Height (between 10 and 100): "
-        self.topple_height = self._get_valid_int(prompt, 10, 100)
+        topple_height = self._get_valid_int(prompt, 10, 100)
         print("- OK\n")
         print(
             "-----------------------------------------------------------------"
@@ -255,18 +342,19 @@ Difficulty Options
             "State the possible actions\n"
             "i.e. how many coins may be added to the tower on each turn\n")
         prompt = "Write a comma separated list of numbers (e.g. '1,3,4'): "
-        self.possible_actions = self._get_valid_int_list(
-            prompt, 1, self.topple_height
-        )
+        possible_actions = self._get_valid_int_list(prompt, 1, topple_height)
         print("- OK\n")
         print(
             "-----------------------------------------------------------------"
             "\n"
         )
 
-        # Write new settings
+        # Apply and write new settings
+        self.difficulty_level = difficulty_level
+        self.topple_height = topple_height
+        self.possible_actions = possible_actions
         print(f"{self._get_settings_str("NEW ")}\n")
-        input("Press Enter to return to main menu: \n")
+        self._input("Press Enter to return to main menu: \n")
         print(
             "-----------------------------------------------------------------"
         )
@@ -278,7 +366,7 @@ Difficulty Options
         before returning to the main menu.
         """
         print(self._get_rules_str())
-        input("Press Enter to return to main menu: \n")
+        self._input("Press Enter to return to main menu: \n")
         print(
             "-----------------------------------------------------------------"
         )
@@ -290,8 +378,129 @@ Difficulty Options
         the program.
         """
         print("\nThanks for playing!\nSee you next time.\n")
+        self.session.clear()
+        sys.exit(0)
+
+    # Idle session handling
+    def _input(self, prompt):
+        """
+        Prompts the user for input, suspending the session if they do not
+        respond within the idle timeout.
+        """
+        try:
+            return timed_input(prompt, self.idle_timeout)
+        except IdleTimeoutError:
+            self._suspend()
+
+    def _suspend(self):
+        """
+        Saves a snapshot of the session and exits so that the memory held by
+        an idle session (including the AI's Q-table) is freed.
+
+        The snapshot holds the game settings, the state of any game in
+        progress and a reference to the cached AI policy. The session is
+        restored by the start() method when the user reconnects.
+        """
+        policy_key = None
+        q_table_bytes = 0
+        if self.ai is not None:
+            # Cache the policy so the AI does not need retraining on resume
+            policy_key = self.policy_cache.get_key(
+                self.topple_height, self.possible_actions
+            )
+            self.policy_cache.save(policy_key, self.ai.q_values)
+            q_table_bytes = get_q_table_bytes(self.ai.q_values)
+
+        self.session.save({
+            "difficulty_level": self.difficulty_level,
+            "topple_height": self.topple_height,
+            "possible_actions": self.possible_actions,
+            "tower_height": self.tower_height,
+            "player": self.player,
+            "policy_key": policy_key,
+        })
+        self.session.record_suspended(q_table_bytes, get_process_bytes())
+
+        print(
+            "\n\nSession paused due to inactivity.\n"
+            "Press 'Run Program' to carry on where you left off.\n"
+        )
         sys.exit(0)
 
+    def _resume(self, snapshot):
+        """
+        Restores the game settings (and any game in progress) from the
+        snapshot of a suspended session.
+
+        A game in progress is resumed with the AI policy referenced by the
+        snapshot, so the AI does not need to be prepared again.
+        """
+        self.session.clear()
+        self.session.record_resumed()
+
+        self.difficulty_level = snapshot["difficulty_level"]
+        self.topple_height = snapshot["topple_height"]
+        self.possible_actions = snapshot["possible_actions"]
+
+        print("Welcome back! Your previous session has been restored.\n")
+        print(self._get_settings_str())
+
+        if snapshot["tower_height"] is not None:
+            # Restore the AI from the policy saved when suspending
+            ai = None
+            q_values = (
+                self.policy_cache.load(snapshot["policy_key"])
+                if snapshot["policy_key"] else None
+            )
+            if q_values is not None:
+                ai = AIPlayer(
+                    self.difficulty_level,
+                    self.topple_height,
+                    self.possible_actions
+                )
+                ai.q_values = q_values
+
+            # The Main Menu is displayed by start() after the game
+            self._play(
+                snapshot["tower_height"], snapshot["player"], ai,
+                show_menu=False
+            )
+
+    def _get_explore_fraction(self):
+        """
+        Returns the probability that the AI makes a random decision at the
+        current difficulty level.
+
+        Uses the value calibrated for the current topple height and possible
+        actions (see difficulty_calibration.py) if there is one, otherwise
+        the default from DIFFICULTY_LEVEL_MAP.
+        """
+        explore_fractions = self.policy_cache.load_explore_fractions(
+            self.policy_cache.get_key(
+                self.topple_height, self.possible_actions
+            )
+        ) or {}
+        return explore_fractions.get(
+            self.difficulty_level,
+            self.DIFFICULTY_LEVEL_MAP[self.difficulty_level][1]
+        )
+
+    def _get_trained_ai(self):
+        """
+        Returns an AIPlayer for the current game settings.
+
+        The dispatcher estimates the cost of loading a cached policy,
+        solving the game exactly or training the AI, and uses the cheapest
+        acceptable option to get the Q-values.
+        """
+        ai = AIPlayer(
+            self.difficulty_level,
+            self.topple_height,
+            self.possible_actions
+        )
+        self.dispatcher.prepare(ai)
+        return ai
+
     # Helper functions for displays
     def _get_title_str(self):
         """
@@ -367,7 +576,7 @@ greater than or equal to the 'topple height'.
         """
         while True:
             try:
-                response = int(input(prompt + "\n"))
+                response = int(self._input(prompt + "\n"))
                 if min <= response <= max:
                     return response
                 raise ValueError
@@ -390,7 +599,7 @@ greater than or equal to the 'topple height'.
         """
         while True:
             try:
-                response = input(prompt + "\n")
+                response = self._input(prompt + "\n")
                 nums = response.split(",")
 
                 # Check enough items in list
@@ -457,7 +666,7 @@ greater than or equal to the 'topple height'.
         # Game loop
         while True:
             try:
-                response = int(input(prompt + "\n"))
+                response = int(self._input(prompt + "\n"))
                 if response in self.possible_actions:
                     return response
                 raise ValueError
@@ -480,7 +689,7 @@ greater than or equal to the 'topple height'.
         """
         while True:
             try:
-                response = input(prompt + "\n")
+                response = self._input(prompt + "\n")
                 response = response.strip().lower()
                 if response in valid_options:
                     return response
@@ -591,6 +800,32 @@ class AIPlayer:
 
         print("AI training complete")
 
+    def solve(self):
+        """
+        Calculates optimal Q-values directly (without training) by working
+        backwards from the topple height.
+
+        A tower height is a 'losing' position if every action either topples
+        the tower or passes the opponent a winning position. Working
+        backwards through the tower heights, each action is assigned:
+        - `1`: passes the opponent a losing position (winning move)
+        - `-0.5`: passes the opponent a winning position
+        - `-1`: topples the tower
+        """
+        is_losing = {}
+        for state in range(self.topple_height - 1, 0, -1):
+            is_losing[state] = True
+            for action in self.possible_actions:
+                next_state = state + action
+                if next_state >= self.topple_height:
+                    q_value = -1
+                elif is_losing[next_state]:
+                    q_value = 1
+                    is_losing[state] = False
+                else:
+                    q_value = -0.5
+                self.q_values[(state, action)] = q_value
+
     # Helper functions
     def _update_q_value(self, state, action, reward):
         """
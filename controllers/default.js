@@ -21,7 +21,9 @@ function socket() {
             cols: 80,
             rows: 24,
             cwd: process.env.PWD,
-            env: process.env
+            env: Object.assign({}, process.env, {
+                SESSION_ID: (client.query && client.query.session) || ''
+            })
         });
 
         client.tty.on('exit', function (code, signal) {
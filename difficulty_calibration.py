@@ -0,0 +1,264 @@
+import argparse
+import contextlib
+import io
+import multiprocessing
+import random
+import time
+
+from coin_tower_topple import AIPlayer, CoinTowerTopple
+from policy_cache import PolicyCache
+from settings_args import parse_actions, parse_range
+from training_dispatcher import TrainingDispatcher
+from training_scheduler import TrainingScheduler
+
+
+# Target win rates for the AI against the reference opponent
+# Key: difficulty_level (see CoinTowerTopple.DIFFICULTY_LEVEL_MAP)
+# Value: fraction of games the AI should win
+# Hard is not calibrated: it always plays the best move (explore_fraction 0)
+TARGET_WIN_RATES = {
+    1: 0.35,
+    2: 0.6,
+}
+
+# Probability that the reference opponent (a typical human player) makes
+# the optimal move rather than a random one
+REFERENCE_SKILL = 0.5
+
+# Number of halvings of the explore fraction interval in each binary search
+SEARCH_STEPS = 7
+
+
+def calibrate_settings(
+    topple_height, possible_actions, num_games=2000, seed=0
+):
+    """
+    Finds the explore fraction for each difficulty level in
+    TARGET_WIN_RATES that makes the AI win that fraction of its games
+    against the reference opponent. Other difficulty levels (i.e. Hard)
+    keep their default explore fraction from DIFFICULTY_LEVEL_MAP, and
+    their simulated win rate is reported for reference.
+
+    The AI plays with the Q-table that the game will use for these settings
+    (loaded from the policy cache, or trained or solved by the dispatcher
+    and shared through the cache), while the reference opponent's good
+    moves are the exact optimum.
+
+    The AI win rate falls as the explore fraction rises, so each target is
+    found by binary search. Every simulation uses the same random seed
+    (common random numbers) so that the noise in the estimated win rates
+    does not disturb the search.
+
+    Returns a tuple of (topple_height, possible_actions, explore_fractions,
+    win_rates) where the last two are dictionaries keyed by difficulty
+    level.
+    """
+    solved_ai = AIPlayer(1, topple_height, possible_actions)
+    solved_ai.solve()
+    optimal_actions = _get_best_actions(solved_ai)
+    ai_actions = _get_best_actions(
+        _get_game_ai(topple_height, possible_actions)
+    )
+
+    def get_win_rate(explore_fraction):
+        return _simulate(
+            topple_height, possible_actions, ai_actions, optimal_actions,
+            explore_fraction, num_games, random.Random(seed)
+        )
+
+    min_win_rate = get_win_rate(1)
+    max_win_rate = get_win_rate(0)
+
+    explore_fractions = {}
+    win_rates = {}
+    for level, target in TARGET_WIN_RATES.items():
+        if target >= max_win_rate:
+            # Unreachable target - play as well as possible
+            explore_fraction, win_rate = 0, max_win_rate
+        elif target <= min_win_rate:
+            # Unreachable target - play as badly as allowed
+            explore_fraction, win_rate = 1, min_win_rate
+        else:
+            low, high = 0, 1
+            for _ in range(SEARCH_STEPS):
+                middle = (low + high) / 2
+                if get_win_rate(middle) > target:
+                    low = middle
+                else:
+                    high = middle
+            explore_fraction = round((low + high) / 2, 3)
+            win_rate = get_win_rate(explore_fraction)
+        explore_fractions[level] = explore_fraction
+        win_rates[level] = win_rate
+
+    for level, (_, explore_fraction) in \
+            CoinTowerTopple.DIFFICULTY_LEVEL_MAP.items():
+        if level not in TARGET_WIN_RATES:
+            explore_fractions[level] = explore_fraction
+            win_rates[level] = get_win_rate(explore_fraction)
+
+    return topple_height, possible_actions, explore_fractions, win_rates
+
+
+def calibrate_all(settings_list, num_games=2000, processes=None):
+    """
+    Calibrates every (topple_height, possible_actions) pair in
+    `settings_list` using a pool of worker processes.
+
+    Results are yielded in the order they finish and saved to the policy
+    cache alongside the policy for those settings.
+    """
+    policy_cache = PolicyCache()
+    tasks = [
+        (topple_height, possible_actions, num_games)
+        for topple_height, possible_actions in settings_list
+    ]
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(_calibrate_task, tasks):
+            topple_height, possible_actions, explore_fractions, win_rates = \
+                result
+            policy_cache.save_explore_fractions(
+                policy_cache.get_key(topple_height, possible_actions),
+                explore_fractions, win_rates
+            )
+            yield result
+
+
+# Helper functions
+def _calibrate_task(task):
+    """
+    Unpacks a task tuple for calibrate_settings (used by the process pool).
+    """
+    topple_height, possible_actions, num_games = task
+    return calibrate_settings(topple_height, possible_actions, num_games)
+
+
+def _get_game_ai(topple_height, possible_actions):
+    """
+    Returns an AIPlayer with the Q-values the game will use for these
+    settings, prepared by the same dispatcher as the game.
+    """
+    policy_cache = PolicyCache()
+    dispatcher = TrainingDispatcher(
+        policy_cache, scheduler=TrainingScheduler(policy_cache)
+    )
+    ai = AIPlayer(1, topple_height, possible_actions)
+    # Hide the training messages printed for the player
+    with contextlib.redirect_stdout(io.StringIO()):
+        dispatcher.prepare(ai)
+    return ai
+
+
+def _get_best_actions(ai):
+    """
+    Returns a list where item `state` is the list of actions with the
+    highest Q-value at that tower height, i.e. the actions that
+    AIPlayer.choose_action picks between when it is not exploring.
+    """
+    best_actions = [[]]  # No tower height of 0
+    for state in range(1, ai.topple_height):
+        q_values = [
+            ai.q_values.get((state, action), 0)
+            for action in ai.possible_actions
+        ]
+        max_q_value = max(q_values)
+        best_actions.append([
+            action for action, q_value in zip(ai.possible_actions, q_values)
+            if q_value == max_q_value
+        ])
+    return best_actions
+
+
+def _simulate(
+    topple_height, possible_actions, ai_actions, optimal_actions,
+    explore_fraction, num_games, rng
+):
+    """
+    Plays `num_games` games between the AI (using `explore_fraction`) and
+    the reference opponent, and returns the fraction won by the AI.
+
+    `ai_actions` and `optimal_actions` list the moves (for each tower
+    height) that the AI and the reference opponent choose between when
+    they are not playing randomly (see _get_best_actions).
+
+    As in the real game, the tower starts with 1 coin and the first player
+    is chosen at random.
+    """
+    ai_wins = 0
+    for _ in range(num_games):
+        tower_height = 1
+        player = rng.random() < 0.5  # True: AI, False: reference opponent
+        while tower_height < topple_height:
+            if player:
+                best_actions = ai_actions
+                optimal = rng.random() >= explore_fraction
+            else:
+                best_actions = optimal_actions
+                optimal = rng.random() < REFERENCE_SKILL
+            tower_height += rng.choice(
+                best_actions[tower_height] if optimal else possible_actions
+            )
+            player = not player
+        # The player who toppled the tower has lost (and the turn has
+        # already passed to the winner)
+        ai_wins += player
+    return ai_wins / num_games
+
+
+def main():
+    """
+    Calibrates the explore fractions for a grid of game settings given on
+    the command line and prints the results as they finish.
+    """
+    parser = argparse.ArgumentParser(
+        description="Calibrate difficulty levels by simulating games."
+    )
+    parser.add_argument(
+        "--heights", type=parse_range, default=range(10, 101),
+        help="topple heights to calibrate, e.g. '10-100' (default)"
+    )
+    parser.add_argument(
+        "--actions", type=parse_actions, nargs="+", default=[[1, 2, 3]],
+        help="possible actions lists, e.g. '1,2,3' (default) '1,3,4'"
+    )
+    parser.add_argument(
+        "--games", type=int, default=2000,
+        help="games simulated per win rate estimate (default 2000)"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=None,
+        help="number of worker processes (default: number of cores)"
+    )
+    args = parser.parse_args()
+
+    settings_list = [
+        (topple_height, actions)
+        for topple_height in args.heights
+        for actions in args.actions
+    ]
+    difficulty_names = {
+        level: description
+        for level, (description, _) in
+        CoinTowerTopple.DIFFICULTY_LEVEL_MAP.items()
+    }
+
+    start_time = time.perf_counter()
+    for topple_height, actions, explore_fractions, win_rates in \
+            calibrate_all(settings_list, args.games, args.processes):
+        levels_str = ", ".join(
+            f"{difficulty_names[level]} {explore_fractions[level]:.3f} "
+            f"({win_rates[level]:.0%})"
+            for level in explore_fractions
+        )
+        print(
+            f"{topple_height:>3} [{','.join(map(str, actions))}]: "
+            f"{levels_str}"
+        )
+    print(
+        f"\nCalibrated {len(settings_list)} settings in "
+        f"{time.perf_counter() - start_time:.1f} seconds"
+    )
+
+
+if __name__ == "__main__":
+    main()
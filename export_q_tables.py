@@ -0,0 +1,310 @@
+import argparse
+import array
+import contextlib
+import csv
+import io
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import zipfile
+
+from bulk_solver import iter_action_sets
+from coin_tower_topple import AIPlayer
+from policy_cache import PolicyCache
+from settings_args import parse_actions, parse_range
+from training_dispatcher import get_reachable_heights
+
+
+SUMMARY_FIELDS = [
+    "topple_height", "possible_actions", "method", "seconds",
+    "first_player_wins", "winning_states", "losing_states",
+    "unreachable_states", "period", "pre_period", "files",
+]
+
+
+def export_grid(
+    settings, output_dir, method="solve", num_games=10000,
+    formats=("npz", "csv"), processes=None, window=256
+):
+    """
+    Trains or solves every (topple_height, possible_actions) pair in
+    `settings` using a pool of worker processes.
+
+    Each worker writes its Q-table straight to `output_dir` (in each of
+    `formats`) and only returns a small summary. A new task is submitted
+    each time a result is received, so the workers are kept busy while at
+    most `window` configurations are in flight and memory use does not grow
+    with the size of the grid. Summaries are yielded in the order they
+    finish.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    in_flight = threading.BoundedSemaphore(window)
+    stopped = threading.Event()
+
+    def get_tasks():
+        # The pool reads tasks in a background thread, which waits here
+        # until a result has been received before submitting another task
+        for topple_height, actions in settings:
+            while not in_flight.acquire(timeout=0.1):
+                if stopped.is_set():
+                    return
+            yield (
+                topple_height, list(actions), output_dir, method, num_games,
+                formats
+            )
+
+    with multiprocessing.Pool(processes, initializer=random.seed) as pool:
+        try:
+            for summary in pool.imap_unordered(_export_task, get_tasks()):
+                in_flight.release()
+                yield summary
+        finally:
+            # Let the task thread finish if the results are not all read
+            stopped.set()
+
+
+def export_settings(
+    topple_height, possible_actions, output_dir, method="solve",
+    num_games=10000, formats=("npz", "csv")
+):
+    """
+    Trains or solves a single configuration, writes its Q-table to
+    `output_dir` and returns a summary dictionary (see SUMMARY_FIELDS).
+    """
+    ai = AIPlayer(1, topple_height, possible_actions)
+    start_time = time.perf_counter()
+    if method == "train":
+        # Hide the training messages printed for the player
+        with contextlib.redirect_stdout(io.StringIO()):
+            ai.train(num_games)
+    else:
+        ai.solve()
+    elapsed = time.perf_counter() - start_time
+
+    states = range(1, topple_height)
+    rows = [
+        [ai.q_values[(state, action)] for action in possible_actions]
+        for state in states
+    ]
+
+    key = PolicyCache().get_key(topple_height, possible_actions)
+    base_path = os.path.join(output_dir, key)
+    files = []
+    if "npz" in formats:
+        files.append(_write_npz(
+            f"{base_path}.npz", states, possible_actions, rows
+        ))
+    if "csv" in formats:
+        files.append(_write_csv(
+            f"{base_path}.csv", states, possible_actions, rows
+        ))
+
+    # A tower height is winning if the best action has a positive Q-value.
+    # Heights that can't be reached from the start are never visited in
+    # training, so they are left out rather than reported as losing
+    reachable = set(get_reachable_heights(topple_height, possible_actions))
+    winning = {
+        state: max(row) > 0
+        for state, row in zip(states, rows) if state in reachable
+    }
+
+    # Outcomes by distance from the topple height, up to the first
+    # unreachable height
+    outcomes = []
+    for state in reversed(states):
+        if state not in reachable:
+            break
+        outcomes.append(winning[state])
+    period, pre_period = get_period(outcomes, max(possible_actions))
+
+    return {
+        "topple_height": topple_height,
+        "possible_actions": " ".join(map(str, possible_actions)),
+        "method": method,
+        "seconds": round(elapsed, 6),
+        "first_player_wins": int(winning[1]),
+        "winning_states": " ".join(
+            str(state) for state, won in winning.items() if won
+        ),
+        "losing_states": " ".join(
+            str(state) for state, won in winning.items() if not won
+        ),
+        "unreachable_states": " ".join(
+            str(state) for state in states if state not in reachable
+        ),
+        "period": period,
+        "pre_period": pre_period,
+        "files": " ".join(files),
+    }
+
+
+def get_period(outcomes, max_action):
+    """
+    Returns (period, pre_period) for a sequence of outcomes ordered by
+    distance from the topple height, where the outcomes repeat every
+    `period` items after the first `pre_period` items.
+
+    Beyond a distance of `max_action`, each outcome only depends on the
+    previous `max_action` outcomes. A pattern is therefore only accepted
+    once `max_action` consecutive outcomes have been seen to repeat, which
+    proves that it continues forever. The smallest such period is
+    returned, or (None, None) if the sequence is too short to prove any
+    period.
+    """
+    length = len(outcomes)
+    for period in range(1, length):
+        # Find the first index after which the pattern repeats exactly
+        pre_period = 0
+        for index in range(length - period - 1, -1, -1):
+            if outcomes[index] != outcomes[index + period]:
+                pre_period = index + 1
+                break
+        if length - period - pre_period >= max_action:
+            return period, pre_period
+    return None, None
+
+
+# Helper functions
+def _export_task(task):
+    """
+    Unpacks a task tuple for export_settings (used by the process pool).
+    """
+    return export_settings(*task)
+
+
+def _get_npy_bytes(type_code, descr, values, shape):
+    """
+    Returns `values` encoded in the NumPy .npy (version 1.0) format, so that
+    the exported tables can be loaded with numpy.load() without NumPy being
+    needed here.
+    """
+    data = array.array(type_code, values)
+    if sys.byteorder == "big":
+        data.byteswap()  # .npy data is stored little-endian (see `descr`)
+    header = (
+        f"{{'descr': '{descr}', 'fortran_order': False, "
+        f"'shape': {shape}, }}"
+    )
+    # Pad the header with spaces so the data starts on a 64 byte boundary
+    padding = 64 - (10 + len(header) + 1) % 64
+    header = (header + " " * padding + "\n").encode("latin1")
+    return (
+        b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little") + header
+        + data.tobytes()
+    )
+
+
+def _write_npz(path, states, possible_actions, rows):
+    """
+    Writes the Q-table as a compressed .npz archive containing the arrays
+    'states', 'actions' and 'q_values' (one row per state). Returns the
+    path.
+    """
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("states.npy", _get_npy_bytes(
+            "q", "<i8", states, (len(states),)
+        ))
+        archive.writestr("actions.npy", _get_npy_bytes(
+            "q", "<i8", possible_actions, (len(possible_actions),)
+        ))
+        archive.writestr("q_values.npy", _get_npy_bytes(
+            "d", "<f8", itertools.chain.from_iterable(rows),
+            (len(states), len(possible_actions))
+        ))
+    return path
+
+
+def _write_csv(path, states, possible_actions, rows):
+    """
+    Writes the Q-table as a CSV file with one row per state and one column
+    per action. Returns the path.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.writer(file)
+        writer.writerow(
+            ["state"] + [f"action_{action}" for action in possible_actions]
+        )
+        for state, row in zip(states, rows):
+            writer.writerow([state] + row)
+    return path
+
+
+def main():
+    """
+    Exports the Q-tables for a grid of game settings given on the command
+    line, writing a summary row for each configuration as it finishes.
+    """
+    parser = argparse.ArgumentParser(
+        description="Train or solve a grid of settings and export Q-tables."
+    )
+    parser.add_argument(
+        "--heights", type=parse_range, default=range(10, 101),
+        help="topple heights, e.g. '10-100' (default)"
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--actions", type=parse_actions, nargs="+",
+        help="possible actions lists, e.g. '1,2,3' '1,3,4' (default 1,2,3)"
+    )
+    group.add_argument(
+        "--max-action", type=int,
+        help="use every action set drawn from 1..N"
+    )
+    parser.add_argument(
+        "--method", choices=["solve", "train"], default="solve",
+        help="how to get the Q-values (default solve)"
+    )
+    parser.add_argument(
+        "--games", type=int, default=10000,
+        help="training games per configuration (default 10000)"
+    )
+    parser.add_argument(
+        "--formats", nargs="+", choices=["npz", "csv"],
+        default=["npz", "csv"], help="table formats (default npz csv)"
+    )
+    parser.add_argument(
+        "--output", default="q_table_exports",
+        help="output directory (default q_table_exports)"
+    )
+    parser.add_argument(
+        "--processes", type=int, default=None,
+        help="number of worker processes (default: number of cores)"
+    )
+    args = parser.parse_args()
+
+    if args.max_action:
+        action_sets = iter_action_sets(args.max_action)
+    else:
+        action_sets = args.actions or [[1, 2, 3]]
+    settings = (
+        (topple_height, actions)
+        for actions in action_sets
+        for topple_height in args.heights
+    )
+
+    start_time = time.perf_counter()
+    summary_path = os.path.join(args.output, "summary.csv")
+    os.makedirs(args.output, exist_ok=True)
+    with open(summary_path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        count = 0
+        for summary in export_grid(
+            settings, args.output, args.method, args.games, args.formats,
+            args.processes
+        ):
+            writer.writerow(summary)
+            count += 1
+
+    print(
+        f"Exported {count} Q-tables to '{args.output}' in "
+        f"{time.perf_counter() - start_time:.1f} seconds"
+    )
+
+
+if __name__ == "__main__":
+    main()
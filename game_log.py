@@ -0,0 +1,255 @@
+import atexit
+import os
+import struct
+import sys
+import time
+from collections import Counter, defaultdict
+
+
+class GameEventLog:
+    """
+    Records moves and results of real games in a compact, append-only
+    binary log for offline analysis.
+
+    Each event is a fixed-size record (see RECORD) so that logs can be
+    streamed without parsing. Events are buffered in memory and written to
+    disk in a single append at the end of each game (or when the buffer is
+    full), so logging adds no noticeable delay to moves. When the log file
+    grows beyond `max_file_bytes` it is rotated to a timestamped file.
+    """
+    DEFAULT_DIRECTORY = "game_logs"
+    FILE_NAME = "events-v1.bin"
+
+    # Event types
+    MOVE = 0
+    RESULT = 1
+
+    # Record layout (30 bytes, little-endian):
+    # - timestamp (float64, seconds since the epoch)
+    # - event type (MOVE or RESULT)
+    # - difficulty level
+    # - topple height
+    # - tower height (before the move, or final height for a result)
+    # - player (who moved, or who won for a result) - 0: human, 1: computer
+    # - coins added (0 for a result)
+    # - possible actions as a 128-bit mask (bit n set if n is an action)
+    RECORD = struct.Struct("<dBBBBBB16s")
+
+    def __init__(
+        self, directory=DEFAULT_DIRECTORY, max_file_bytes=1_000_000,
+        buffer_records=256
+    ):
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.buffer_records = buffer_records
+        self._buffer = []
+
+        # Don't lose buffered events if the program exits mid-game
+        atexit.register(self.flush)
+
+    # Public methods
+    def log_move(
+        self, difficulty_level, topple_height, possible_actions,
+        tower_height, player, coins
+    ):
+        """
+        Buffers an event recording that `player` added `coins` to a tower of
+        height `tower_height`.
+        """
+        self._append(
+            self.MOVE, difficulty_level, topple_height, possible_actions,
+            tower_height, player, coins
+        )
+
+    def log_result(
+        self, difficulty_level, topple_height, possible_actions,
+        tower_height, winner
+    ):
+        """
+        Buffers an event recording the winner of a game and writes all
+        buffered events to disk.
+        """
+        self._append(
+            self.RESULT, difficulty_level, topple_height, possible_actions,
+            tower_height, winner, 0
+        )
+        self.flush()
+
+    def flush(self):
+        """
+        Appends all buffered events to the log file, rotating the file if it
+        has grown beyond the maximum size.
+        """
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        self._buffer = []
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, self.FILE_NAME)
+            with open(path, "ab") as file:
+                file.write(data)
+                size = file.tell()
+            if size >= self.max_file_bytes:
+                self._rotate(path)
+        except OSError as e:
+            # Logging must never interrupt a game
+            print(f"Unable to write game log: {e}", file=sys.stderr)
+
+    # Helper functions
+    def _append(
+        self, event_type, difficulty_level, topple_height, possible_actions,
+        tower_height, player, coins
+    ):
+        """
+        Packs an event into a record and adds it to the buffer.
+        """
+        actions_mask = sum(1 << action for action in possible_actions)
+        self._buffer.append(self.RECORD.pack(
+            time.time(), event_type, difficulty_level, topple_height,
+            min(tower_height, 255), player, coins,
+            actions_mask.to_bytes(16, "little")
+        ))
+        if len(self._buffer) >= self.buffer_records:
+            self.flush()
+
+    def _rotate(self, path):
+        """
+        Renames the current log file to a timestamped file so that a new
+        file is started on the next write.
+        """
+        rotated_path = os.path.join(
+            self.directory,
+            f"events-v1-{time.time_ns()}-{os.getpid()}.bin"
+        )
+        try:
+            os.rename(path, rotated_path)
+        except FileNotFoundError:
+            pass  # Already rotated by another session
+
+
+def get_log_paths(directory=GameEventLog.DEFAULT_DIRECTORY):
+    """
+    Returns the paths of all game log files in `directory` (oldest first).
+    Files that are renamed by another session while the directory is being
+    listed are skipped.
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    paths = []
+    for name in names:
+        if name.startswith("events-v1") and name.endswith(".bin"):
+            path = os.path.join(directory, name)
+            try:
+                paths.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                pass  # Rotated by another session since it was listed
+    return [path for _, path in sorted(paths)]
+
+
+def iter_events(directory=GameEventLog.DEFAULT_DIRECTORY, chunk_records=4096):
+    """
+    Streams events from all log files as dictionaries, reading
+    `chunk_records` records at a time so that memory use stays constant
+    regardless of the size of the logs.
+    """
+    record = GameEventLog.RECORD
+    for path in get_log_paths(directory):
+        try:
+            file = open(path, "rb")
+        except FileNotFoundError:
+            continue  # Rotated by another session since it was listed
+        with file:
+            leftover = b""
+            while True:
+                data = file.read(record.size * chunk_records)
+                if not data:
+                    break  # Any leftover bytes are an incomplete record
+                # Keep any incomplete record (e.g. one being appended by
+                # another session) to complete it with the next read
+                data = leftover + data
+                split = len(data) - len(data) % record.size
+                chunk, leftover = data[:split], data[split:]
+                for (
+                    timestamp, event_type, difficulty_level, topple_height,
+                    tower_height, player, coins, actions_mask
+                ) in record.iter_unpack(chunk):
+                    mask = int.from_bytes(actions_mask, "little")
+                    yield {
+                        "timestamp": timestamp,
+                        "event_type": event_type,
+                        "difficulty_level": difficulty_level,
+                        "topple_height": topple_height,
+                        "possible_actions": tuple(
+                            action for action in range(mask.bit_length())
+                            if mask >> action & 1
+                        ),
+                        "tower_height": tower_height,
+                        "player": player,
+                        "coins": coins,
+                    }
+
+
+def summarise(directory=GameEventLog.DEFAULT_DIRECTORY):
+    """
+    Streams the game logs into aggregate statistics.
+
+    Returns a dictionary containing:
+    - games: number of games per difficulty level
+    - human_wins: number of games won by the human per difficulty level
+    - settings: number of games per (topple height, possible actions)
+    - human_moves: number of times the human chose each number of coins,
+    keyed by (topple height, possible actions, tower height)
+    """
+    games = Counter()
+    human_wins = Counter()
+    settings = Counter()
+    human_moves = defaultdict(Counter)
+
+    for event in iter_events(directory):
+        config = (event["topple_height"], event["possible_actions"])
+        if event["event_type"] == GameEventLog.RESULT:
+            games[event["difficulty_level"]] += 1
+            settings[config] += 1
+            if event["player"] == 0:
+                human_wins[event["difficulty_level"]] += 1
+        elif event["player"] == 0:
+            human_moves[config + (event["tower_height"],)][
+                event["coins"]
+            ] += 1
+
+    return {
+        "games": games,
+        "human_wins": human_wins,
+        "settings": settings,
+        "human_moves": human_moves,
+    }
+
+
+def main():
+    """
+    Prints a summary of the game logs (in the directory given as the first
+    command line argument, if any).
+    """
+    directory = (
+        sys.argv[1] if len(sys.argv) > 1 else GameEventLog.DEFAULT_DIRECTORY
+    )
+    stats = summarise(directory)
+
+    print("WIN RATES BY DIFFICULTY")
+    for level in sorted(stats["games"]):
+        games = stats["games"][level]
+        wins = stats["human_wins"][level]
+        print(f"- Level {level}: {games} games, human won {wins / games:.1%}")
+
+    print("\nMOST PLAYED SETTINGS")
+    for (height, actions), games in stats["settings"].most_common(10):
+        actions_str = ", ".join(map(str, actions))
+        print(f"- Topple Height {height}, Actions {actions_str}: {games}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import os
+import re
+import sys
+
+try:
+    import fcntl
+except ImportError:  # fcntl is not available on Windows
+    fcntl = None
+
+try:
+    import select
+except ImportError:  # select is not available on some platforms
+    select = None
+
+from json_files import read_json, write_json
+
+
+class IdleTimeoutError(Exception):
+    """
+    Raised when the user does not respond to a prompt within the idle
+    timeout.
+    """
+    def __init__(self, timeout):
+        super().__init__(f"no input received for {timeout} seconds")
+        self.timeout = timeout
+
+
+def timed_input(prompt, timeout):
+    """
+    Behaves like the built-in input() function but raises IdleTimeoutError
+    if the user does not enter a line within `timeout` seconds.
+
+    The timeout only applies to interactive terminals on platforms that
+    support select() on stdin (e.g. the mock terminal used in deployment).
+    Otherwise, or if `timeout` is falsy, the call blocks as usual.
+    """
+    if not timeout or select is None or not sys.stdin.isatty():
+        return input(prompt)
+
+    print(prompt, end="", flush=True)
+    ready, _, _ = select.select([sys.stdin], [], [], timeout)
+    if not ready:
+        raise IdleTimeoutError(timeout)
+    return input()
+
+
+class SessionStore:
+    """
+    Saves and restores snapshots of idle game sessions.
+
+    A snapshot is a small JSON file holding the game settings, the state of
+    any game in progress and a reference to the cached AI policy. A separate
+    stats file counts how many sessions were suspended and resumed and how
+    much memory was reclaimed by freeing idle processes.
+    """
+    DEFAULT_DIRECTORY = "sessions"
+    STATS_FILE_NAME = "reaper_stats.json"
+    STATS_LOCK_FILE_NAME = "reaper_stats.lock"
+
+    def __init__(self, session_id, directory=DEFAULT_DIRECTORY):
+        # Only allow safe characters since the id is used as a file name
+        self.session_id = (
+            re.sub(r"[^A-Za-z0-9_-]", "", session_id)[:64] or "local"
+        )
+        self.directory = directory
+
+    # Public methods
+    def save(self, snapshot):
+        """
+        Writes the session snapshot to disk. Returns the file path.
+        """
+        path = self._get_snapshot_path()
+        write_json(path, snapshot)
+        return path
+
+    def load(self):
+        """
+        Returns the saved snapshot for this session, or None if there isn't
+        one.
+        """
+        return read_json(self._get_snapshot_path())
+
+    def clear(self):
+        """
+        Deletes the saved snapshot (if any) for this session.
+        """
+        try:
+            os.remove(self._get_snapshot_path())
+        except FileNotFoundError:
+            pass
+
+    def get_stats(self):
+        """
+        Returns a dictionary of reaper counters:
+        - sessions_suspended: number of idle sessions that were freed
+        - sessions_resumed: number of snapshots that were restored
+        - q_table_bytes_reclaimed: estimated size of freed Q-tables
+        - process_bytes_reclaimed: peak memory of the freed processes
+        """
+        stats = {
+            "sessions_suspended": 0,
+            "sessions_resumed": 0,
+            "q_table_bytes_reclaimed": 0,
+            "process_bytes_reclaimed": 0,
+        }
+        stats.update(read_json(self._get_stats_path()) or {})
+        return stats
+
+    def record_suspended(self, q_table_bytes, process_bytes):
+        """
+        Updates the counters after an idle session has been suspended.
+        """
+        self._update_stats(
+            sessions_suspended=1,
+            q_table_bytes_reclaimed=q_table_bytes,
+            process_bytes_reclaimed=process_bytes
+        )
+
+    def record_resumed(self):
+        """
+        Updates the counters after a snapshot has been restored.
+        """
+        self._update_stats(sessions_resumed=1)
+
+    # Helper functions
+    def _get_snapshot_path(self):
+        """
+        Returns the path of the snapshot file for this session.
+        """
+        return os.path.join(self.directory, f"{self.session_id}.json")
+
+    def _get_stats_path(self):
+        """
+        Returns the path of the (shared) reaper stats file.
+        """
+        return os.path.join(self.directory, self.STATS_FILE_NAME)
+
+    def _update_stats(self, **updates):
+        """
+        Adds `updates` to the stats file. The file is locked (where fcntl
+        is available) so that sessions updating the stats at the same time
+        don't overwrite each other.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        lock_path = os.path.join(self.directory, self.STATS_LOCK_FILE_NAME)
+        with open(lock_path, "a") as lock_file:
+            if fcntl is not None:
+                # The lock is released when the file is closed
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            stats = self.get_stats()
+            for name, value in updates.items():
+                stats[name] += value
+            write_json(self._get_stats_path(), stats)
+
+
+def get_q_table_bytes(q_values):
+    """
+    Returns an estimate of the memory (in bytes) used by a Q-table
+    dictionary, including its keys and values.
+    """
+    total = sys.getsizeof(q_values)
+    for key, value in q_values.items():
+        total += sys.getsizeof(key) + sys.getsizeof(value)
+        total += sum(sys.getsizeof(item) for item in key)
+    return total
+
+
+def get_process_bytes():
+    """
+    Returns the peak resident memory (in bytes) of the current process, or
+    0 if this cannot be determined on the current platform.
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
@@ -0,0 +1,27 @@
+import json
+import os
+
+
+def read_json(path):
+    """
+    Returns the JSON data stored at `path`, or None if the file is missing
+    or unreadable.
+    """
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path, data):
+    """
+    Atomically writes `data` as JSON to `path` (via a temporary file) so
+    that other sessions never read a half-written file. The directory is
+    created if necessary.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump(data, file)
+    os.replace(temp_path, path)
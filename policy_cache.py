@@ -0,0 +1,108 @@
+import hashlib
+import os
+
+from json_files import read_json, write_json
+
+
+class PolicyCache:
+    """
+    Stores trained Q-tables on disk so that they can be reused instead of
+    retraining the AI for game settings that have already been played.
+
+    Each policy is saved as a small JSON file whose name is derived from the
+    topple height and possible actions (the only settings that affect
+    training).
+    """
+    DEFAULT_DIRECTORY = "policy_cache"
+    MAX_ACTIONS_STR_LENGTH = 100  # Longer action lists are hashed
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+
+    # Public methods
+    def get_key(self, topple_height, possible_actions):
+        """
+        Returns the cache key (file name without extension) for the given
+        game settings, e.g. '21_1-2-3'.
+
+        Long lists of possible actions are replaced by a hash so that the
+        file name stays within file system limits.
+        """
+        actions_str = "-".join(map(str, sorted(possible_actions)))
+        if len(actions_str) > self.MAX_ACTIONS_STR_LENGTH:
+            digest = hashlib.sha1(actions_str.encode()).hexdigest()
+            actions_str = f"{len(possible_actions)}-actions-{digest}"
+        return f"{topple_height}_{actions_str}"
+
+    def get_path(self, key):
+        """
+        Returns the path of the JSON file used to store the policy `key`.
+        """
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key):
+        """
+        Returns the Q-table stored for `key` as a dictionary with
+        (state, action) tuple keys, or None if it has not been cached.
+        """
+        data = self._read(key)
+        if data is None:
+            return None
+        return {
+            (state, action): q_value
+            for state, action, q_value in data["q_values"]
+        }
+
+    def save(self, key, q_values):
+        """
+        Writes a Q-table to the cache, keeping any other data already stored
+        alongside the policy. Returns the path of the cache file.
+        """
+        data = self._read(key) or {}
+        data["q_values"] = [
+            [state, action, q_value]
+            for (state, action), q_value in q_values.items()
+        ]
+        return self._write(key, data)
+
+    def load_explore_fractions(self, key):
+        """
+        Returns the calibrated explore fractions stored alongside the policy
+        `key` as a dictionary of {difficulty_level: explore_fraction}, or
+        None if the settings have not been calibrated.
+        """
+        data = self._read(f"{key}.difficulty")
+        if data is None:
+            return None
+        return {
+            int(level): explore_fraction
+            for level, explore_fraction in data["explore_fractions"].items()
+        }
+
+    def save_explore_fractions(self, key, explore_fractions, win_rates):
+        """
+        Writes calibrated explore fractions (and the simulated AI win rates
+        they achieved) to a file next to the policy `key`. Returns the path
+        of the file.
+        """
+        return self._write(f"{key}.difficulty", {
+            "explore_fractions": explore_fractions,
+            "win_rates": win_rates,
+        })
+
+    # Helper functions
+    def _read(self, key):
+        """
+        Returns the raw JSON data stored for `key`, or None if the file is
+        missing or unreadable.
+        """
+        return read_json(self.get_path(key))
+
+    def _write(self, key, data):
+        """
+        Atomically writes `data` to the cache file for `key` (via a temporary
+        file) so that other sessions never read a half-written policy.
+        """
+        path = self.get_path(key)
+        write_json(path, data)
+        return path
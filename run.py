@@ -1,3 +1,5 @@
+import os
+
 from coin_tower_topple import CoinTowerTopple
 
 
@@ -6,9 +8,11 @@ def main():
     Starts the CoinTowerTopple game.
 
     This function creates an instance of the CoinTowerTopple class and
-    starts the game by calling its start() method.
+    starts the game by calling its start() method. The SESSION_ID
+    environment variable (set by the web terminal) identifies the player so
+    that an idle session can be resumed when they reconnect.
     """
-    app = CoinTowerTopple()
+    app = CoinTowerTopple(os.environ.get("SESSION_ID", "local"))
     app.start()
 
 
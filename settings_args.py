@@ -0,0 +1,15 @@
+def parse_range(text):
+    """
+    Parses a range of topple heights such as '10-100' (inclusive) or a
+    single height such as '21'. Used as an argparse type.
+    """
+    start, _, end = text.partition("-")
+    return range(int(start), int(end or start) + 1)
+
+
+def parse_actions(text):
+    """
+    Parses a comma separated list of possible actions such as '1,3,4'. Used
+    as an argparse type.
+    """
+    return sorted(int(item) for item in text.split(","))
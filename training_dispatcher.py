@@ -0,0 +1,341 @@
+import json
+import os
+import sys
+import time
+
+from json_files import read_json, write_json
+
+
+class TrainingDispatcher:
+    """
+    Chooses the cheapest acceptable way of preparing the AI's Q-values for a
+    particular combination of game settings.
+
+    The possible paths are:
+    - cached: load a Q-table saved in the policy cache
+    - solve: calculate optimal Q-values directly (AIPlayer.solve)
+    - short_training: train the AI on SHORT_TRAINING_GAMES games
+    - full_training: train the AI on FULL_TRAINING_GAMES games
+
+    A path is acceptable if it is allowed (see DEFAULT_PATHS), and:
+    - cached: a Q-table for the game settings is in the policy cache
+    - short_training: every reachable state-action pair is expected to be
+    visited at least MIN_VISITS_PER_PAIR times
+    - short_training and full_training: the estimated time is within
+    TRAINING_BUDGET_SECONDS
+    - solve: always
+
+    If no allowed path is acceptable, the game is solved exactly
+    (FALLBACK_PATH), which is quick for any settings.
+
+    The cost of each path is estimated from the topple height, the number of
+    possible actions and the number of reachable tower heights. Every
+    decision is logged (as JSON lines) alongside the measured time so that
+    the cost model can be recalibrated from real data (see calibrate()).
+    """
+    DEFAULT_LOG_PATH = os.path.join("training_dispatch", "decisions.jsonl")
+    DEFAULT_MODEL_PATH = os.path.join("training_dispatch", "cost_model.json")
+
+    SHORT_TRAINING_GAMES = 1000
+    FULL_TRAINING_GAMES = 10000
+
+    # Paths used by default. The game's AI learns by Q-learning, so the
+    # exact solve is only used if it is included in `allowed_paths`
+    DEFAULT_PATHS = ["cached", "short_training", "full_training"]
+    FALLBACK_PATH = "solve"
+
+    # Training is only acceptable if it is expected to take at most this
+    # many seconds, so that players are not kept waiting
+    TRAINING_BUDGET_SECONDS = 1.0
+
+    # Short training is only acceptable if each reachable state-action pair
+    # is expected to be visited at least this many times
+    MIN_VISITS_PER_PAIR = 20
+
+    # Estimated seconds per unit of work for each path (see _get_work_units)
+    # Measured: loading a cached Q-table (JSON) takes roughly twice as long
+    # as solving the same settings, and both are far quicker than training
+    DEFAULT_COEFFICIENTS = {
+        "cached": 8e-7,
+        "solve": 4e-7,
+        "short_training": 4.5e-7,
+        "full_training": 4.5e-7,
+    }
+
+    def __init__(
+        self, policy_cache=None, allowed_paths=None,
+        log_path=DEFAULT_LOG_PATH, model_path=DEFAULT_MODEL_PATH,
+        scheduler=None
+    ):
+        """
+        Parameters:
+        policy_cache (PolicyCache, optional): Cache of saved Q-tables. If
+        None, the 'cached' path is never used.
+        allowed_paths (list, optional): Paths the dispatcher may choose from.
+        Defaults to DEFAULT_PATHS (all paths except 'solve').
+        log_path (str, optional): JSON lines file for logging decisions.
+        model_path (str, optional): JSON file of calibrated coefficients.
+        scheduler (TrainingScheduler, optional): Shares and limits training
+        between sessions. If None, training runs directly.
+        """
+        self.policy_cache = policy_cache
+        self.scheduler = scheduler
+        self.allowed_paths = allowed_paths or list(self.DEFAULT_PATHS)
+        self.log_path = log_path
+        self.coefficients = dict(self.DEFAULT_COEFFICIENTS)
+        self.coefficients.update(read_json(model_path) or {})
+
+    # Public methods
+    def estimate(self, topple_height, possible_actions):
+        """
+        Returns a dictionary of estimated times (in seconds) for each
+        acceptable path. Paths that are not allowed or not acceptable for
+        these game settings are omitted.
+        """
+        units = self._get_work_units(topple_height, possible_actions)
+        estimates = {}
+        for path in self.allowed_paths:
+            if path == "cached" and not self._is_cached(
+                topple_height, possible_actions
+            ):
+                continue
+            if path == "short_training" and not self._is_short_acceptable(
+                topple_height, possible_actions
+            ):
+                continue
+            estimate = units[path] * self.coefficients[path]
+            if path.endswith("_training") and (
+                estimate > self.TRAINING_BUDGET_SECONDS
+            ):
+                continue
+            estimates[path] = estimate
+        return estimates
+
+    def choose_path(self, topple_height, possible_actions):
+        """
+        Returns the cheapest acceptable path and the estimates it was
+        chosen from. Falls back to FALLBACK_PATH if no path is acceptable.
+        """
+        estimates = self.estimate(topple_height, possible_actions)
+        return self._get_cheapest(estimates), estimates
+
+    def prepare(self, ai):
+        """
+        Fills in the Q-values of an (untrained) AIPlayer using the cheapest
+        acceptable path, then logs the decision and the measured time.
+        Returns the chosen path.
+
+        If the cached Q-table turns out to be unreadable, the next cheapest
+        path is used instead.
+        """
+        path, estimates = self.choose_path(
+            ai.topple_height, ai.possible_actions
+        )
+
+        start_time = time.perf_counter()
+        shared = False
+        if path == "cached":
+            q_values = self.policy_cache.load(
+                self.policy_cache.get_key(
+                    ai.topple_height, ai.possible_actions
+                )
+            )
+            if q_values is None:
+                del estimates["cached"]
+                path = self._get_cheapest(estimates)
+            else:
+                ai.q_values = q_values
+        if path == "solve":
+            ai.solve()
+        elif path != "cached":
+            shared = self._train(ai, path)
+        elapsed = time.perf_counter() - start_time
+
+        self._log({
+            "timestamp": time.time(),
+            "topple_height": ai.topple_height,
+            "possible_actions": ai.possible_actions,
+            "path": path,
+            "work_units": self._get_work_units(
+                ai.topple_height, ai.possible_actions
+            )[path],
+            "estimates": estimates,
+            "seconds": elapsed,
+            "shared": shared,
+        })
+        return path
+
+    # Helper functions
+    def _get_cheapest(self, estimates):
+        """
+        Returns the path with the lowest estimated time, or FALLBACK_PATH if
+        `estimates` is empty.
+        """
+        if not estimates:
+            return self.FALLBACK_PATH
+        return min(estimates, key=estimates.get)
+
+    def _train(self, ai, path):
+        """
+        Trains the AI for the number of games given by `path`, via the
+        scheduler if there is one. Returns True if the Q-table came from
+        another session's training (so the elapsed time was spent waiting
+        rather than training).
+        """
+        num_games = (
+            self.SHORT_TRAINING_GAMES if path == "short_training"
+            else self.FULL_TRAINING_GAMES
+        )
+        if self.scheduler is None:
+            ai.train(num_games)
+            return False
+
+        def train():
+            ai.train(num_games)
+            return ai.q_values
+
+        ai.q_values, shared = self.scheduler.run(
+            ai.topple_height, ai.possible_actions, train
+        )
+        return shared
+
+    def _get_work_units(self, topple_height, possible_actions):
+        """
+        Returns the amount of work (in arbitrary units) required by each
+        path. The estimated time is the number of units multiplied by the
+        coefficient for that path.
+
+        - cached: one unit per state-action pair (to parse the JSON).
+        - solve: one unit per state-action pair.
+        - training: each move evaluates every action a few times (to choose
+        the opponent's move and the future reward) plus a fixed overhead,
+        so a game costs (moves per game) x (actions + 5) units.
+        """
+        num_actions = len(possible_actions)
+        pairs = (topple_height - 1) * num_actions
+        move_units = self._get_moves_per_game(
+            topple_height, possible_actions
+        ) * (num_actions + 5)
+        return {
+            "cached": pairs,
+            "solve": pairs,
+            "short_training": self.SHORT_TRAINING_GAMES * move_units,
+            "full_training": self.FULL_TRAINING_GAMES * move_units,
+        }
+
+    def _get_moves_per_game(self, topple_height, possible_actions):
+        """
+        Returns the expected number of moves in a training game, in which
+        actions are chosen at random.
+        """
+        mean_action = sum(possible_actions) / len(possible_actions)
+        return max(1, (topple_height - 1) / mean_action)
+
+    def _get_reachable_states(self, topple_height, possible_actions):
+        """
+        Returns the number of tower heights that can be reached from the
+        starting height of 1 (before the tower topples).
+        """
+        return len(get_reachable_heights(topple_height, possible_actions))
+
+    def _is_short_acceptable(self, topple_height, possible_actions):
+        """
+        Returns True if short training is expected to visit every reachable
+        state-action pair often enough to learn accurate Q-values.
+        """
+        pairs = self._get_reachable_states(
+            topple_height, possible_actions
+        ) * len(possible_actions)
+        moves = self.SHORT_TRAINING_GAMES * self._get_moves_per_game(
+            topple_height, possible_actions
+        )
+        return moves / pairs >= self.MIN_VISITS_PER_PAIR
+
+    def _is_cached(self, topple_height, possible_actions):
+        """
+        Returns True if a Q-table for these game settings is in the cache.
+        """
+        if self.policy_cache is None:
+            return False
+        key = self.policy_cache.get_key(topple_height, possible_actions)
+        return os.path.exists(self.policy_cache.get_path(key))
+
+    def _log(self, record):
+        """
+        Appends a decision record to the log file. Logging failures are
+        reported but never interrupt the game.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Unable to log training decision: {e}", file=sys.stderr)
+
+
+def calibrate(
+    log_path=TrainingDispatcher.DEFAULT_LOG_PATH,
+    model_path=TrainingDispatcher.DEFAULT_MODEL_PATH
+):
+    """
+    Recalibrates the cost model from the decision log.
+
+    For each path, the coefficient is the least squares fit (through the
+    origin) of measured seconds against work units. The log is streamed line
+    by line and the new coefficients are saved to `model_path` and
+    returned. Paths with no logged decisions are left unchanged, and
+    decisions served by another session's training are ignored.
+    """
+    sums = {}  # path: [sum(units * seconds), sum(units ** 2)]
+    try:
+        with open(log_path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # Skip partially written lines
+                if record.get("shared"):
+                    continue
+                units = record["work_units"]
+                totals = sums.setdefault(record["path"], [0, 0])
+                totals[0] += units * record["seconds"]
+                totals[1] += units ** 2
+    except FileNotFoundError:
+        pass
+
+    coefficients = dict(TrainingDispatcher.DEFAULT_COEFFICIENTS)
+    coefficients.update(read_json(model_path) or {})
+    for path, (units_seconds, units_squared) in sums.items():
+        if units_squared:
+            coefficients[path] = units_seconds / units_squared
+
+    write_json(model_path, coefficients)
+    return coefficients
+
+
+def get_reachable_heights(topple_height, possible_actions):
+    """
+    Returns a sorted list of the tower heights that can be reached from the
+    starting height of 1 (before the tower topples).
+    """
+    reachable = 1 << 1  # bit n is set if tower height n is reachable
+    for state in range(1, topple_height):
+        if reachable >> state & 1:
+            for action in possible_actions:
+                reachable |= 1 << (state + action)
+    return [
+        state for state in range(1, topple_height) if reachable >> state & 1
+    ]
+
+
+def main():
+    """
+    Recalibrates the cost model from the decision log and prints the new
+    coefficients.
+    """
+    for path, coefficient in calibrate().items():
+        print(f"{path:<16} {coefficient:.3e} seconds per unit")
+
+
+if __name__ == "__main__":
+    main()
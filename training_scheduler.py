@@ -0,0 +1,253 @@
+import json
+import os
+import time
+
+from policy_cache import PolicyCache
+
+try:
+    import fcntl
+except ImportError:  # fcntl is not available on Windows
+    fcntl = None
+
+
+class TrainingScheduler:
+    """
+    Coordinates AI training between all the game sessions on one host.
+
+    Each session runs in its own process, so the scheduler uses file locks
+    in `directory`:
+    - Identical requests are deduplicated: only one session trains the AI
+    for a given (topple_height, possible_actions) at a time. Other sessions
+    wait for it to finish and then load the Q-table from the policy cache.
+    - At most `max_concurrent` trainings run at once (defaults to the number
+    of CPU cores). Further requests take a numbered ticket and are given
+    free slots in ticket order (first come, first served). Tickets of
+    sessions that were closed while waiting are skipped.
+
+    Queue wait times and the number of suppressed duplicate trainings are
+    recorded in a metrics file (see get_metrics()). On platforms without
+    fcntl, training simply runs directly.
+    """
+    DEFAULT_DIRECTORY = "training_jobs"
+    METRICS_FILE_NAME = "metrics.json"
+    POLL_INTERVAL = 0.05  # Seconds between checks for a free slot
+    COUNTER_FILE_NAME = "queue_counter.txt"
+
+    def __init__(
+        self, policy_cache, max_concurrent=None, directory=DEFAULT_DIRECTORY
+    ):
+        self.policy_cache = policy_cache
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.directory = directory
+
+    # Public methods
+    def run(self, topple_height, possible_actions, train):
+        """
+        Returns the Q-table for the given game settings, calling `train` (a
+        function that returns a Q-table) only if no other session is already
+        training the AI for the same settings.
+
+        Returns a tuple of (q_values, shared) where `shared` is True if the
+        Q-table was produced by another session's training.
+        """
+        if fcntl is None:
+            return train(), False
+
+        os.makedirs(self.directory, exist_ok=True)
+        key = self.policy_cache.get_key(topple_height, possible_actions)
+        start_time = time.perf_counter()
+
+        # Deduplicate identical requests that are already in flight
+        key_lock = self._lock(f"{key}.lock", blocking=False)
+        if key_lock is None:
+            print("Waiting for the AI to finish training...")
+            key_lock = self._lock(f"{key}.lock")
+            q_values = self.policy_cache.load(key)
+            if q_values is not None:
+                self._unlock(key_lock)
+                self._record(
+                    duplicates_suppressed=1,
+                    duplicate_wait_seconds=time.perf_counter() - start_time
+                )
+                return q_values, True
+
+        try:
+            slot_lock = self._acquire_slot()
+            queue_wait = time.perf_counter() - start_time
+            try:
+                q_values = train()
+            finally:
+                self._unlock(slot_lock)
+
+            # Share the result with any sessions waiting on this key
+            self.policy_cache.save(key, q_values)
+        finally:
+            self._unlock(key_lock)
+
+        self._record(
+            trainings_run=1,
+            queue_wait_seconds=queue_wait,
+            max_queue_wait_seconds=queue_wait
+        )
+        return q_values, False
+
+    def get_metrics(self):
+        """
+        Returns a dictionary of scheduler metrics:
+        - trainings_run: number of trainings that were run
+        - duplicates_suppressed: number of requests served by another
+        session's training instead of training again
+        - queue_wait_seconds: total time spent waiting for a training slot
+        - max_queue_wait_seconds: longest time spent waiting for a slot
+        - duplicate_wait_seconds: total time spent waiting for another
+        session's training to finish
+        """
+        metrics = {
+            "trainings_run": 0,
+            "duplicates_suppressed": 0,
+            "queue_wait_seconds": 0,
+            "max_queue_wait_seconds": 0,
+            "duplicate_wait_seconds": 0,
+        }
+        try:
+            path = os.path.join(self.directory, self.METRICS_FILE_NAME)
+            with open(path, encoding="utf-8") as file:
+                metrics.update(json.load(file))
+        except (OSError, ValueError):
+            pass
+        return metrics
+
+    # Helper functions
+    def _acquire_slot(self):
+        """
+        Waits for one of the `max_concurrent` training slots and returns its
+        (locked) file.
+
+        The session takes a ticket and only competes for a free slot once
+        its ticket is at the front of the queue, so waiting sessions are
+        served in the order they arrived.
+        """
+        ticket_name, ticket_lock = self._take_ticket()
+        try:
+            while True:
+                if self._is_first_in_queue(ticket_name):
+                    for slot in range(self.max_concurrent):
+                        slot_lock = self._lock(
+                            f"slot-{slot}.lock", blocking=False
+                        )
+                        if slot_lock is not None:
+                            return slot_lock
+                time.sleep(self.POLL_INTERVAL)
+        finally:
+            self._remove_ticket(ticket_name, ticket_lock)
+
+    def _take_ticket(self):
+        """
+        Joins the back of the queue by creating a ticket file named after
+        the next sequence number. The ticket stays locked while the session
+        is waiting, which shows that it is still alive.
+
+        Returns the ticket file name and its (locked) file.
+        """
+        queue_lock = self._lock("queue.lock")
+        try:
+            path = os.path.join(self.directory, self.COUNTER_FILE_NAME)
+            try:
+                with open(path, encoding="utf-8") as file:
+                    sequence = int(file.read()) + 1
+            except (OSError, ValueError):
+                sequence = 1
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(str(sequence))
+
+            # Zero padding makes the file names sort in ticket order
+            ticket_name = f"ticket-{sequence:012d}.lock"
+            return ticket_name, self._lock(ticket_name)
+        finally:
+            self._unlock(queue_lock)
+
+    def _is_first_in_queue(self, ticket_name):
+        """
+        Returns True if no live session holds an earlier ticket than
+        `ticket_name`. Earlier tickets that are no longer locked belong to
+        sessions that were closed while waiting, so they are removed.
+        """
+        queue_lock = self._lock("queue.lock")
+        try:
+            earlier_tickets = sorted(
+                name for name in os.listdir(self.directory)
+                if name.startswith("ticket-") and name < ticket_name
+            )
+            for name in earlier_tickets:
+                ticket_lock = self._lock(name, blocking=False)
+                if ticket_lock is None:
+                    return False  # Still waiting
+                self._remove_ticket(name, ticket_lock)
+            return True
+        finally:
+            self._unlock(queue_lock)
+
+    def _remove_ticket(self, ticket_name, ticket_lock):
+        """
+        Deletes a ticket file and releases its lock.
+        """
+        try:
+            os.remove(os.path.join(self.directory, ticket_name))
+        except FileNotFoundError:
+            pass
+        self._unlock(ticket_lock)
+
+    def _lock(self, name, blocking=True):
+        """
+        Opens the lock file `name` and takes an exclusive lock on it.
+        Returns the open file, or None if `blocking` is False and the lock
+        is held by another session.
+        """
+        file = open(os.path.join(self.directory, name), "a")
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(file, flags)
+        except BlockingIOError:
+            file.close()
+            return None
+        return file
+
+    def _unlock(self, file):
+        """
+        Releases the lock held on an open lock file and closes it.
+        """
+        fcntl.flock(file, fcntl.LOCK_UN)
+        file.close()
+
+    def _record(self, **updates):
+        """
+        Adds `updates` to the metrics file (or takes the maximum for
+        max_* metrics). The file is locked so that sessions updating the
+        metrics at the same time don't overwrite each other.
+        """
+        metrics_lock = self._lock("metrics.lock")
+        try:
+            metrics = self.get_metrics()
+            for name, value in updates.items():
+                if name.startswith("max_"):
+                    metrics[name] = max(metrics[name], value)
+                else:
+                    metrics[name] += value
+            path = os.path.join(self.directory, self.METRICS_FILE_NAME)
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(metrics, file, indent=2)
+        finally:
+            self._unlock(metrics_lock)
+
+
+def main():
+    """
+    Prints the scheduler metrics for this host.
+    """
+    metrics = TrainingScheduler(PolicyCache()).get_metrics()
+    for name, value in metrics.items():
+        print(f"{name:<24} {value:g}")
+
+
+if __name__ == "__main__":
+    main()